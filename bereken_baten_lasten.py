@@ -1,9 +1,12 @@
 import os
 import csv
+import argparse
 from pathlib import Path
 
 import pandas as pd
 
+from etl_profiel import Profiel
+
 # Globals
 IV3_MAP = "Brondata/Iv3/"
 CLASSES = "Brondata/Gemeenteklassen/"
@@ -11,7 +14,8 @@ SOC_CTR = "Brondata/sociale_structuur_centrumfunctie.csv"
 NAMES = "Brondata/gemeentenamen.csv"
 ANALYSEMAP = "Analysedata/Iv3/"
 
-def main():
+def main(profile=None, geheugen=False):
+    profiel = Profiel("bereken_baten_lasten", actief=profile is not None, geheugen=geheugen)
     
     for file in os.listdir(IV3_MAP):
         jaar = file[:4]
@@ -23,16 +27,32 @@ def main():
             output_name =  f'{jaar}_jaarrekening.csv'
     
         # Create output df
-        df = pd.read_csv(str(IV3_MAP) + file)
+        with profiel.stage("read_csv", file) as stage:
+            df = pd.read_csv(str(IV3_MAP) + file)
+            stage["rijen"] = len(df)
         
-        totals = get_taakveld_totals(df)
-        totals_w_classes = add_class_data(totals, jaar)
-        totals_right_names = replace_gemeente_names(totals_w_classes)
+        with profiel.stage("get_taakveld_totals", file) as stage:
+            totals = get_taakveld_totals(df)
+            stage["rijen"] = len(totals)
+        with profiel.stage("add_class_data", file) as stage:
+            totals_w_classes = add_class_data(totals, jaar)
+            stage["rijen"] = len(totals_w_classes)
+        with profiel.stage("replace_gemeente_names", file) as stage:
+            totals_right_names = replace_gemeente_names(totals_w_classes)
+            stage["rijen"] = len(totals_right_names)
         
-        output_df = add_total_general(totals_right_names)
+        with profiel.stage("add_total_general", file) as stage:
+            output_df = add_total_general(totals_right_names)
+            stage["rijen"] = len(output_df)
         
-        output_df.to_csv(str(ANALYSEMAP) + output_name, sep=";", index=False) # ; For Nuenen Gerwen
+        with profiel.stage("to_csv", file) as stage:
+            output_df.to_csv(str(ANALYSEMAP) + output_name, sep=";", index=False) # ; For Nuenen Gerwen
+            stage["rijen"] = len(output_df)
         print(output_name)
+    
+    if profile:
+        profiel.write(profile)
+        profiel.print_summary()
                 
 def get_taakveld_totals(df):
     k = "k_2ePlaatsing_2"
@@ -100,4 +120,11 @@ def add_total_general(df):
     return df
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", nargs="?", const="profiel_bereken_baten_lasten.json", 
+                        help="Write wall time, CPU time and rows per stage to this JSON file")
+    parser.add_argument("--geheugen", action="store_true", 
+                        help="With --profile: also trace peak Python memory per stage (slows down the timings)")
+    args = parser.parse_args()
+    
+    main(profile=args.profile, geheugen=args.geheugen)
@@ -0,0 +1,138 @@
+import os
+import json
+import shutil
+import hashlib
+
+import pandas as pd
+import pyarrow as pa
+
+# Input: dataset map, read_csv options
+BRONNEN = {
+    "Analysedata/Iv3/": {"sep": ";"},
+    "Analysedata/GF/": {"sep": ";"},
+    "Analysedata/Vergelijkbaar/": {"sep": ";"},
+    "Analysedata/Realisatie/": {"sep": ";"},
+    "Brondata/Gemeenteklassen/": {"sep": "\t"},
+    "Brondata/GF/": {"sep": ","},
+    "Brondata/GF/Clusterdata/": {"sep": "\t", "decimal": ",", "thousands": "."},
+}
+BUNDEL_MAP = "Analysedata/Bundel/"
+MANIFEST = BUNDEL_MAP + "manifest.json"
+
+def main():
+    bestanden = get_bronbestanden(BRONNEN)
+    hashes = get_hashes(bestanden)
+    versie = get_versie(hashes)
+    versie_map = BUNDEL_MAP + versie
+
+    # Running apps may have the files of a version memory-mapped: write new versions
+    # next to it and rename, never overwrite an existing one
+    bestaat = os.path.exists(versie_map)
+    tijdelijke_map = versie_map + ".tmp/"
+    if not bestaat:
+        os.makedirs(tijdelijke_map, exist_ok=True)
+
+    datasets = {}
+    for naam, (filepath, opties) in bestanden.items():
+        bestand = naam.replace("/", "_") + ".arrow"
+
+        # Same content hashes: the files of this version are already there
+        if bestaat:
+            rijen = count_arrow_rows(versie_map + "/" + bestand)
+        else:
+            df = pd.read_csv(filepath, **opties)
+            write_arrow(df, tijdelijke_map + bestand)
+            rijen = len(df)
+        datasets[naam] = {"bestand": bestand, "bron": filepath, "rijen": rijen, "hash": hashes[naam]}
+        print(naam)
+
+    if not bestaat:
+        os.rename(tijdelijke_map, versie_map)
+
+    vorige_versie = get_manifest_versie(MANIFEST)
+    write_manifest({"versie": versie, "datasets": datasets}, MANIFEST)
+    print(versie)
+
+    # Workers may still have the previous version memory-mapped: keep it one publish longer
+    prune_versies(BUNDEL_MAP, {versie, vorige_versie})
+
+
+def get_bronbestanden(bronnen):
+    # Dataset name is the file path without .csv, e.g. Analysedata/Iv3/2024_begroting
+    bestanden = {}
+    for bronmap, opties in bronnen.items():
+        for file in sorted(os.listdir(bronmap)):
+            if file.endswith(".csv"):
+                naam = bronmap + file[:-4]
+                bestanden[naam] = (bronmap + file, opties)
+
+    return bestanden
+
+
+def get_hashes(bestanden):
+    # Content hash per dataset, so the app only reloads datasets that changed
+    hashes = {}
+    for naam, (filepath, _) in bestanden.items():
+        with open(filepath, mode='rb') as file:
+            hashes[naam] = hashlib.sha256(file.read()).hexdigest()[:12]
+
+    return hashes
+
+
+def get_versie(hashes):
+    # Same data always gives the same bundle version
+    h = hashlib.sha256()
+    for naam, dataset_hash in hashes.items():
+        h.update(f"{naam}:{dataset_hash}".encode("utf-8"))
+
+    return h.hexdigest()[:12]
+
+
+def write_arrow(df, filepath):
+    # NaN stays a float value instead of a null, so numeric columns convert back without a copy
+    table = pa.table({col: pa.array(df[col], from_pandas=df[col].dtype == object) for col in df.columns})
+
+    # Uncompressed IPC file, so it can be memory-mapped without a copy
+    with pa.OSFile(filepath, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def count_arrow_rows(filepath):
+    # Row count from the batch metadata, without reading the columns
+    with pa.memory_map(filepath, "r") as source:
+        reader = pa.ipc.open_file(source)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def get_manifest_versie(filepath):
+    try:
+        with open(filepath, mode='r', encoding='utf-8') as file:
+            return json.load(file)["versie"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+
+def prune_versies(bundel_map, behouden):
+    # Remove version maps (and leftover .tmp maps) that no manifest refers to anymore
+    for naam in sorted(os.listdir(bundel_map)):
+        if naam in behouden or not os.path.isdir(bundel_map + naam):
+            continue
+        try:
+            shutil.rmtree(bundel_map + naam)
+            print(f"Verwijderd: {naam}")
+        except OSError as e:
+            # E.g. still memory-mapped on Windows: retried on the next publish
+            print(f"Niet verwijderd: {naam} ({e})")
+
+
+def write_manifest(manifest, filepath):
+    # Write next to the old manifest and swap, so readers never see half a file
+    tijdelijk = filepath + ".tmp"
+    with open(tijdelijk, mode='w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(tijdelijk, filepath)
+
+
+if __name__ == "__main__":
+    main()
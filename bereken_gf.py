@@ -1,23 +1,37 @@
 import os
 import csv
+import argparse
 
 import pandas as pd
 
+from etl_profiel import Profiel
+from gemeentefonds import create_gf_model, calculate_totals, get_uitkeringsfactor
+
 # Input
-GF_MAP = "Brondata/GF/clusterdata/"
-UF_CSV = "Brondata/GF/uitkeringsfactor.csv"
+GF_MAP = "Brondata/GF/Clusterdata/"
+UF_CSV = "Brondata/GF/Uitkeringsfactor.csv"
 OUTPUT_MAP = "Analysedata/GF/"
 
-def main():
-    circulaires = get_gf_data(GF_MAP, UF_CSV)
+def main(profile=None, geheugen=False):
+    profiel = Profiel("bereken_gf", actief=profile is not None, geheugen=geheugen)
+    
+    with profiel.stage("get_gf_data") as stage:
+        circulaires = get_gf_data(GF_MAP, UF_CSV)
+        stage["rijen"] = len(circulaires)
     
     if circulaires:
-        clusters = calculate_clusters(circulaires, UF_CSV)
+        clusters = calculate_clusters(circulaires, UF_CSV, profiel)
         
     if clusters:
         for key, value in clusters.items():
             print(key)
-            value.to_csv(OUTPUT_MAP + key + ".csv", sep=";") # ; For Nuenen Gerwen
+            with profiel.stage("to_csv", key) as stage:
+                value.to_csv(OUTPUT_MAP + key + ".csv", sep=";") # ; For Nuenen Gerwen
+                stage["rijen"] = len(value)
+    
+    if profile:
+        profiel.write(profile)
+        profiel.print_summary()
 
 
 def get_gf_data(gf_map, uf_csv):
@@ -40,89 +54,28 @@ def get_gf_data(gf_map, uf_csv):
     return gf_data
 
 
-def calculate_clusters(circulaires, uf_csv):
+def calculate_clusters(circulaires, uf_csv, profiel=None):
     
-    # Define closure to convert values to numeric, with error handling
-    def safe_to_numeric(x):
-        try:
-            return pd.to_numeric(x)
-        except ValueError:
-            return x
+    if profiel is None:
+        profiel = Profiel("calculate_clusters")
     
     cluster_data_dict = {}
+    uf_data = pd.read_csv(uf_csv)
     
     for circulaire in circulaires:
-        uf_checklist, uf_list = get_uf(uf_csv)
-        
-        df_gewichten = pd.read_csv(GF_MAP + circulaire + "_Gewichten.csv", sep='\t', decimal=',', thousands='.') 
-        df_volumina = pd.read_csv(GF_MAP + circulaire + "_Volumina.csv", sep='\t', decimal=',', thousands='.')
-        df_siudu = pd.read_csv(GF_MAP + circulaire + "_SIUDU.csv", sep='\t', decimal=',', thousands='.')
-        
-        # Define indices, set to numeric
-        df_gewichten = df_gewichten.set_index("Codering maatstaf")
-        df_volumina = df_volumina.set_index("Naam")
-        df_siudu = df_siudu.set_index("Naam")
-        
-        df_gewichten = df_gewichten.apply(safe_to_numeric)
-        df_volumina = df_volumina.apply(safe_to_numeric)
-        df_siudu = df_siudu.apply(safe_to_numeric)
-        
-        # Take clusters from gewichten
-        clusters = list(df_gewichten.columns[1:])
-        
         # Take uitkeringsfactor from circulaire
-        uf = float([row for row in uf_list if row.startswith(circulaire[3:])][0][11:])
+        uf = get_uitkeringsfactor(uf_data, circulaire)
         
-        # Calculate cluster totals per gemeente
-        outputdict = {}
-        for i, r in df_volumina.iterrows():
-            linedict = {}
-    
-            gemeente = r.name
-            
-            # Create dicts for volumina/siudu column names and values per gemeente
-            volumina_columns = df_volumina.columns[2:]
-            volumina_values = r[2:].values
-            volumina_dict = {v: w for v, w in zip(volumina_columns, volumina_values)}
-            
-            siudu_columns = df_siudu.columns[2:]
-            siudu_values = df_siudu.loc[gemeente].values[2:]
-            siudu_dict = {v: w for v, w in zip(siudu_columns, siudu_values)}
-            
-            for c in clusters:
+        # Read gewichten, volumina and SIUDU of the circulaire
+        with profiel.stage("get_gf_model", circulaire) as stage:
+            model = get_gf_model(GF_MAP, circulaire, uf)
+            stage["rijen"] = len(model["gemeenten"])
         
-                # Create dicts for gewichten column names and values per gemeente where index != nan (excludes IUDU)
-                gewichten_rows = df_gewichten.index[df_gewichten.index.notna()]
-                gewichten_per_cluster = df_gewichten[c][df_gewichten.index.notna()].values
-                gewichten_dict = {v: w for v, w in zip(gewichten_rows, gewichten_per_cluster)}
-                
-                # SIUDU gewichten: ART 12 added manually to cluster Overig
-                siudu_gewichten_namen = list(df_gewichten[df_gewichten.index.isna()]['Naam maatstaf'])
-                siudu_gewichten = list(df_gewichten[df_gewichten.index.isna()][c])
-                siudu_gewichten_dict = {v: w for v, w in zip(siudu_gewichten_namen, siudu_gewichten)}
-                
-                cluster_total = 0
-
-                # Match dict keys of gewichten and volumina for AU clusters
-                if len(gewichten_dict) == len(volumina_dict):
-                    for key in gewichten_dict.keys():
-                        if key in volumina_dict:
-                            ufactor = 1 if "woz" in key.lower() else uf
-                            cluster_total += ufactor * gewichten_dict[key] * volumina_dict[key]
-                
-                # Match dict keys of gewichten and volumina for SIUDU
-                if len(siudu_gewichten_dict) == len(siudu_dict):
-                    for key in siudu_gewichten_dict.keys():
-                        if key in siudu_dict:
-                            cluster_total += siudu_gewichten_dict[key] * siudu_dict[key]
-                
-                linedict[c] = cluster_total
-                    
-            outputdict[gemeente] = linedict
-            
-        df = pd.DataFrame(outputdict).T
+        # Calculate cluster totals per gemeente
+        with profiel.stage("calculate_totals", circulaire) as stage:
+            df = pd.DataFrame(calculate_totals(model), index=model["gemeenten"], columns=model["clusters"])
+            stage["rijen"] = len(df)
         df = df.reset_index()
-        df = df.rename(columns={"index": "Gemeenten"})
         
         # Calculate total row correctly by summing each column
         total_row = pd.DataFrame({
@@ -135,7 +88,16 @@ def calculate_clusters(circulaires, uf_csv):
 
         cluster_data_dict[circulaire] = df
     return cluster_data_dict
-        
+
+
+def get_gf_model(gf_map, circulaire, uf):
+    
+    df_gewichten = pd.read_csv(gf_map + circulaire + "_Gewichten.csv", sep='\t', decimal=',', thousands='.') 
+    df_volumina = pd.read_csv(gf_map + circulaire + "_Volumina.csv", sep='\t', decimal=',', thousands='.')
+    df_siudu = pd.read_csv(gf_map + circulaire + "_SIUDU.csv", sep='\t', decimal=',', thousands='.')
+    
+    return create_gf_model(circulaire, df_gewichten, df_volumina, df_siudu, uf)
+
 
 def get_uf(uf_csv):
     with open(uf_csv, mode='r', encoding='utf-8', ) as file:
@@ -151,4 +113,11 @@ def get_uf(uf_csv):
         
      
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", nargs="?", const="profiel_bereken_gf.json", 
+                        help="Write wall time, CPU time and rows per stage to this JSON file")
+    parser.add_argument("--geheugen", action="store_true", 
+                        help="With --profile: also trace peak Python memory per stage (slows down the timings)")
+    args = parser.parse_args()
+    
+    main(profile=args.profile, geheugen=args.geheugen)
@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from clusterindeling import aggregate_clusters
+
+# Globals
+ANALYSEMAP = "Analysedata/Iv3/"
+OUTPUT_MAP = "Analysedata/Realisatie/"
+WAARDEN = ["Baten", "Lasten", "Saldo"]
+
+def main():
+
+    for jaar in get_realisatiejaren(ANALYSEMAP):
+        begroting = pd.read_csv(f"{ANALYSEMAP}{jaar}_begroting.csv", sep=";")
+        jaarrekening = pd.read_csv(f"{ANALYSEMAP}{jaar}_jaarrekening.csv", sep=";")
+
+        taakvelden = get_realisatie_taakvelden(begroting, jaarrekening)
+        clusters = get_realisatie_clusters(taakvelden, jaar)
+
+        taakvelden.to_csv(f"{OUTPUT_MAP}{jaar}_taakvelden.csv", sep=";", index=False) # ; For Nuenen Gerwen
+        clusters.to_csv(f"{OUTPUT_MAP}{jaar}_clusters.csv", sep=";", index=False)
+        print(jaar)
+
+def get_realisatiejaren(analysemap):
+    # Only years with both a begroting and a jaarrekening
+    files = os.listdir(analysemap)
+    jaren = sorted({file[:4] for file in files if file.endswith("_begroting.csv")})
+    jaren = [jaar for jaar in jaren if f"{jaar}_jaarrekening.csv" in files]
+
+    return jaren
+
+def get_realisatie_taakvelden(begroting, jaarrekening):
+    keys = ["Gemeenten", "Taakveld"]
+
+    # Inwonertal from begroting, same source in both documents
+    inwoners = begroting.groupby("Gemeenten")["Inwonertal"].first()
+
+    b = begroting[keys + ["Baten", "Lasten"]].fillna({"Baten": 0, "Lasten": 0})
+    j = jaarrekening[keys + ["Baten", "Lasten"]].fillna({"Baten": 0, "Lasten": 0})
+
+    df = pd.merge(b, j, on=keys, how="outer", suffixes=(" begroting", " jaarrekening"))
+    df = df.fillna(0)
+
+    for doc in ["begroting", "jaarrekening"]:
+        df[f"Saldo {doc}"] = df[f"Lasten {doc}"] - df[f"Baten {doc}"]
+    for waarde in WAARDEN:
+        df[f"{waarde} verschil"] = df[f"{waarde} jaarrekening"] - df[f"{waarde} begroting"]
+
+    df["Inwonertal"] = df["Gemeenten"].map(inwoners)
+
+    return df
+
+def get_realisatie_clusters(taakvelden, jaar):
+    waarde_columns = [col for col in taakvelden.columns if col.split(" ")[0] in WAARDEN]
+
+    # All gemeenten in one group-by on the compiled taakveld -> cluster lookup
+    df = aggregate_clusters(taakvelden, jaar, waarde_columns, by="Gemeenten")
+
+    # Overig has no taakvelden
+    df = df[df["Cluster"] != "Overig"]
+
+    inwoners = taakvelden.groupby("Gemeenten")["Inwonertal"].first()
+    df["Inwonertal"] = df["Gemeenten"].map(inwoners)
+    df["Saldo verschil per inwoner"] = round(1000 * df["Saldo verschil"] / df["Inwonertal"], 2)
+
+    # National outliers: z-score of verschil per inwoner within each cluster, excl. Nederland
+    gemeenten = df["Gemeenten"] != "Nederland"
+    per_cluster = df[gemeenten].groupby("Cluster")["Saldo verschil per inwoner"]
+    gemiddelde = df["Cluster"].map(per_cluster.mean())
+    spreiding = df["Cluster"].map(per_cluster.std()).replace(0, np.nan)
+    df["Afwijking"] = ((df["Saldo verschil per inwoner"] - gemiddelde) / spreiding).where(gemeenten).round(2)
+
+    return df
+
+if __name__ == "__main__":
+    main()
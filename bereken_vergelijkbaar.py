@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from clusterindeling import aggregate_clusters
+
+# Globals
+ANALYSEMAP = "Analysedata/Iv3/"
+OUTPUT_MAP = "Analysedata/Vergelijkbaar/"
+AANTAL_BUREN = 10
+
+# Uitgavenclusters die samen het profiel van een gemeente vormen
+PROFIEL_CLUSTERS = [
+    "Bestuur en ondersteuning",
+    "Sociale basisvoorzieningen",
+    "Participatie",
+    "Individuele voorzieningen Wmo",
+    "Individuele voorzieningen Jeugd",
+    "Orde en veiligheid",
+    "Onderwijs",
+    "Sport, cultuur en recreatie",
+    "Infrastructuur, ruimte en milieu",
+    "Overhead",
+]
+
+def main():
+
+    for file in os.listdir(ANALYSEMAP):
+        if not file.endswith(".csv"):
+            continue
+
+        df = pd.read_csv(ANALYSEMAP + file, sep=";")
+
+        profielen = get_cluster_profielen(df, file[:4])
+        output_df = get_buren(profielen, AANTAL_BUREN)
+
+        output_df.to_csv(OUTPUT_MAP + file, sep=";", index=False) # ; For Nuenen Gerwen
+        print(file)
+
+def get_cluster_profielen(df, jaar):
+
+    # Nederland is the total row, not a gemeente to compare with
+    df = df[df['Gemeenten'] != "Nederland"]
+    df = df.assign(Saldo=df['Lasten'].fillna(0) - df['Baten'].fillna(0))
+
+    # Netto lasten per cluster per gemeente
+    totals = aggregate_clusters(df, jaar, ["Saldo"], by="Gemeenten")
+    profielen = totals.pivot(index="Gemeenten", columns="Cluster", values="Saldo")[PROFIEL_CLUSTERS]
+
+    # Per inwoner, so gemeenten of different sizes can be compared
+    inwoners = df.groupby('Gemeenten')['Inwonertal'].first()
+    profielen = profielen.div(inwoners, axis=0)
+
+    return profielen
+
+def get_buren(profielen, aantal):
+
+    # Normalize each cluster, so large clusters do not dominate the distance
+    waarden = profielen.to_numpy(dtype=float)
+    spreiding = waarden.std(axis=0)
+    spreiding[spreiding == 0] = 1
+    genormaliseerd = (waarden - waarden.mean(axis=0)) / spreiding
+
+    # Exact distance matrix; a gemeente is not its own neighbour
+    kwadraten = (genormaliseerd ** 2).sum(axis=1)
+    afstanden = kwadraten[:, None] + kwadraten[None, :] - 2 * genormaliseerd @ genormaliseerd.T
+    afstanden = np.sqrt(np.clip(afstanden, 0, None))
+    np.fill_diagonal(afstanden, np.inf)
+
+    # Top-k neighbours per gemeente, sorted by distance
+    aantal = min(aantal, len(profielen) - 1)
+    buren = np.argpartition(afstanden, aantal, axis=1)[:, :aantal]
+    buren_afstanden = np.take_along_axis(afstanden, buren, axis=1)
+    volgorde = np.argsort(buren_afstanden, axis=1)
+    buren = np.take_along_axis(buren, volgorde, axis=1)
+    buren_afstanden = np.take_along_axis(buren_afstanden, volgorde, axis=1)
+
+    gemeenten = profielen.index.to_numpy()
+    output_df = pd.DataFrame({
+        "Gemeenten": np.repeat(gemeenten, aantal),
+        "Rang": np.tile(np.arange(1, aantal + 1), len(gemeenten)),
+        "Vergelijkbaar": gemeenten[buren.ravel()],
+        "Afstand": buren_afstanden.ravel().round(4),
+    })
+
+    return output_df
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# GF clusters to Iv3-taakveldcodes per indeling, keyed by the first year it applies.
+# A code covers all taakvelden starting with it; the longest matching code wins,
+# so "0.1" is Bestuur while "0.10" and "0.11" have their own cluster.
+CLUSTER_INDELINGEN = {
+    2017: {
+        "Sociale basisvoorzieningen" : ("6.1", "6.2", "7.1"),
+        "Participatie": ("6.3", "6.4", "6.5"),
+        "Individuele voorzieningen Wmo": ("6.6", "6.71", "6.81"),
+        "Individuele voorzieningen Jeugd": ("6.72", "6.73", "6.74", "6.75", "6.76", "6.792", "6.82", "6.92"),
+        "Bestuur en ondersteuning": ("0.1", "0.2"),
+        "Orde en veiligheid": ("1.",),
+        "Onderwijs": ("4.",),
+        "Sport, cultuur en recreatie": ("5.",),
+        "Infrastructuur, ruimte en milieu": ("0.63", "0.9", "2.", "3.", "7.2", "7.3", "7.4", "7.5", "8.1", "8.3"),
+        "Overig": (), # Only in the Gemeentefonds, no taakvelden
+        "Overige eigen middelen": ("0.11", "0.3", "0.5", "0.64", "0.8", "8.2"),
+        "Onroerendezaakbelasting": ("0.61", "0.62"),
+        "Overhead" : ("0.4",),
+        "Gemeentefonds" : ("0.7",),
+        "Mutatie reserves": ("0.10",), # Waarom hier niet 0.11 bij?
+    },
+}
+
+# Iv3 2025: PGB WMO (6.791) and Coördinatie en beleid WMO (6.91) added.
+# Later indelingen only list the clusters that differ from the previous one
+CLUSTER_INDELINGEN[2025] = {
+    **CLUSTER_INDELINGEN[2017],
+    "Individuele voorzieningen Wmo": ("6.6", "6.71", "6.791", "6.81", "6.91"),
+}
+
+
+def get_indeling_jaar(jaar):
+    # Most recent indeling that applies to this year
+    jaren = [j for j in CLUSTER_INDELINGEN if j <= int(jaar)]
+    if not jaren:
+        raise ValueError(f"Geen clusterindeling voor {jaar}")
+
+    return max(jaren)
+
+
+def get_cluster_dict(jaar):
+
+    return CLUSTER_INDELINGEN[get_indeling_jaar(jaar)]
+
+
+@lru_cache(maxsize=None)
+def compile_indeling(taakvelden, indeling_jaar):
+    # Exact lookup: position of each taakveld in the tuple -> cluster index
+    cluster_dict = CLUSTER_INDELINGEN[indeling_jaar]
+
+    code_to_cluster = {}
+    for i, iv3_codes in enumerate(cluster_dict.values()):
+        for code in iv3_codes:
+            if code in code_to_cluster:
+                raise ValueError(f"Taakveldcode {code} staat in meer dan één cluster ({indeling_jaar})")
+            code_to_cluster[code] = i
+
+    # Longest code first, so the most specific definition wins
+    codes = sorted(code_to_cluster, key=len, reverse=True)
+
+    lookup = np.full(len(taakvelden), -1, dtype=np.int8)
+    for t, taakveld in enumerate(taakvelden):
+        taakveld_code = taakveld.split(" ")[0]
+        for code in codes:
+            if taakveld_code.startswith(code):
+                lookup[t] = code_to_cluster[code]
+                break
+
+    # Every taakveld must map to exactly one cluster
+    ongekoppeld = [taakvelden[t] for t in np.flatnonzero(lookup == -1)]
+    if ongekoppeld:
+        raise ValueError(f"Taakvelden zonder cluster ({indeling_jaar}): {', '.join(ongekoppeld)}")
+
+    return lookup
+
+
+def get_cluster_codes(taakvelden, jaar):
+    # Cluster index per row, compiled once per unique set of taakvelden
+    uniek, inverse = np.unique(np.asarray(taakvelden, dtype=str), return_inverse=True)
+    lookup = compile_indeling(tuple(uniek), get_indeling_jaar(jaar))
+
+    return lookup[inverse]
+
+
+def get_clusters(taakvelden, jaar):
+    # Categorical of clusters, in the order of the cluster definition
+    clusters = list(get_cluster_dict(jaar))
+
+    return pd.Categorical.from_codes(get_cluster_codes(taakvelden, jaar), categories=clusters)
+
+
+def aggregate_clusters(df, jaar, columns, by=None):
+    # Single group-by on the cluster codes; clusters without taakvelden sum to 0
+    clusters = get_clusters(df["Taakveld"], jaar)
+
+    if by is None:
+        totals = df[columns].groupby(clusters, observed=False).sum()
+        totals.index = totals.index.astype(str).rename("Cluster")
+        return totals
+
+    # Long format: one row per by-value and cluster
+    totals = df[columns].groupby([df[by].to_numpy(), clusters], observed=False).sum()
+    totals = totals.rename_axis([by, "Cluster"]).reset_index()
+    totals["Cluster"] = totals["Cluster"].astype(str)
+
+    return totals
@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import threading
+import traceback
+
+import pandas as pd
+import pyarrow as pa
+
+
+# Memory-mapped datasets from bereken_bundel.py, reloaded when the manifest changes.
+# Entries are cached per dataset content hash. On a new version the datasets in use
+# are loaded first, then swapped in at once; only entries whose content changed are dropped.
+class DataBundel:
+
+    def __init__(self, bundel_map, interval=30):
+        self.bundel_map = bundel_map
+        self.manifest_path = bundel_map + "manifest.json"
+        self.interval = interval
+
+        self._lock = threading.Lock()
+        self._manifest_mtime = None
+        self.versie = None
+        self._datasets = {}  # naam: manifest entry
+        self._tabellen = {}  # naam: pyarrow Table
+        self._cache = {}     # (naam, verwerk naam): (hash, verwerk, waarde)
+
+        self.ververs()
+
+        if interval:
+            threading.Thread(target=self._bewaak, daemon=True).start()
+
+    def get(self, naam, verwerk=None):
+        # None if the dataset is not in the bundle
+        key = (naam, verwerk.__qualname__ if verwerk else None)
+
+        with self._lock:
+            if naam not in self._tabellen:
+                return None
+
+            dataset_hash = self._datasets[naam]["hash"]
+            tabel = self._tabellen[naam]
+            if key in self._cache and self._cache[key][0] == dataset_hash:
+                return self._cache[key][2]
+
+        # Load outside the lock, so other sessions are not held up by a first load
+        waarde = self._laad(tabel, verwerk)
+
+        with self._lock:
+            # Another session may have loaded it meanwhile; never store a replaced version
+            if key in self._cache and self._cache[key][0] == dataset_hash:
+                return self._cache[key][2]
+            if naam in self._datasets and self._datasets[naam]["hash"] == dataset_hash:
+                self._cache[key] = (dataset_hash, verwerk, waarde)
+
+        return waarde
+
+    def get_hash(self, naam):
+        # Content hash of a dataset, None if it is not in the bundle
+        with self._lock:
+            dataset = self._datasets.get(naam)
+
+        return dataset["hash"] if dataset else None
+
+    def ververs(self):
+        # Cheap check first: only read the manifest when the file changed
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._manifest_mtime:
+            return False
+
+        with open(self.manifest_path, mode='r', encoding='utf-8') as file:
+            manifest = json.load(file)
+        if manifest["versie"] == self.versie:
+            self._manifest_mtime = mtime
+            return False
+
+        # Memory-mapped, so all worker processes share the same pages
+        versie_map = self.bundel_map + manifest["versie"] + "/"
+        tabellen = {}
+        for naam, dataset in manifest["datasets"].items():
+            source = pa.memory_map(versie_map + dataset["bestand"], "r")
+            tabellen[naam] = pa.ipc.open_file(source).read_all()
+
+        # Keep unchanged entries, load changed ones in use before the swap
+        with self._lock:
+            cache = dict(self._cache)
+        nieuwe_cache = {}
+        for key, (dataset_hash, verwerk, waarde) in cache.items():
+            dataset = manifest["datasets"].get(key[0])
+            if dataset is None:
+                continue
+            if dataset["hash"] != dataset_hash:
+                waarde = self._laad(tabellen[key[0]], verwerk)
+            nieuwe_cache[key] = (dataset["hash"], verwerk, waarde)
+
+        with self._lock:
+            # Entries loaded by get() in the meantime are kept if still current
+            for key, (dataset_hash, verwerk, waarde) in self._cache.items():
+                dataset = manifest["datasets"].get(key[0])
+                if key not in nieuwe_cache and dataset is not None and dataset["hash"] == dataset_hash:
+                    nieuwe_cache[key] = (dataset_hash, verwerk, waarde)
+
+            self.versie = manifest["versie"]
+            self._datasets = manifest["datasets"]
+            self._tabellen = tabellen
+            self._cache = nieuwe_cache
+            self._manifest_mtime = mtime
+
+        return True
+
+    def _laad(self, tabel, verwerk):
+        # Numeric columns and Arrow-backed strings keep pointing at the memory-mapped bundle
+        data = tabel.to_pandas(split_blocks=True,
+                               types_mapper=lambda t: pd.ArrowDtype(t) if pa.types.is_string(t) else None)
+
+        return verwerk(data) if verwerk else data
+
+    def _bewaak(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.ververs()
+            except (OSError, ValueError, KeyError, pa.ArrowException):
+                # Half-published bundle: keep serving the current version, retry next time
+                continue
+            except Exception:
+                # Anything else is a bug: report it, but keep watching
+                traceback.print_exc()
@@ -0,0 +1,98 @@
+import sys
+import json
+import time
+import platform
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+# Wall time, CPU time, peak memory and row counts per ETL stage and input file.
+# Inactive (no --profile) stages only yield an empty record.
+# tracemalloc slows Python code down several times, so peak memory is opt-in (geheugen)
+# and the timings of such a run are not comparable with a timing-only run.
+GEHEUGEN_NOOT = "Python allocations only (tracemalloc); C-level buffers, e.g. of the read_csv parser, are not included"
+
+class Profiel:
+
+    def __init__(self, script, actief=False, geheugen=False):
+        self.script = script
+        self.actief = actief
+        self.geheugen = actief and geheugen
+        self.stages = []
+        self.start = time.time()
+
+        if self.geheugen:
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, stage, bestand=None):
+        # Set record["rijen"] inside the block to log the row count
+        record = {"stage": stage, "bestand": bestand, "rijen": None}
+        if not self.actief:
+            yield record
+            return
+
+        if self.geheugen:
+            tracemalloc.reset_peak()
+            geheugen_start = tracemalloc.get_traced_memory()[0]
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        yield record
+
+        record["wall_s"] = round(time.perf_counter() - wall_start, 4)
+        record["cpu_s"] = round(time.process_time() - cpu_start, 4)
+        if self.geheugen:
+            record["piek_mb"] = round((tracemalloc.get_traced_memory()[1] - geheugen_start) / 2**20, 2)
+        piek_rss = get_piek_rss()
+        record["rss_mb"] = round(piek_rss / 2**20, 1) if piek_rss is not None else None
+        self.stages.append(record)
+
+    def write(self, filepath):
+        rapport = {
+            "script": self.script,
+            "start": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.start)),
+            "wall_s": round(time.time() - self.start, 4),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "geheugen": self.geheugen,
+            "piek_mb": GEHEUGEN_NOOT if self.geheugen else "Not measured, run with --geheugen",
+            "stages": self.stages,
+        }
+
+        with open(filepath, mode='w', encoding='utf-8') as file:
+            json.dump(rapport, file, indent=2)
+
+    def print_summary(self):
+        # Per stage, summed over input files; peak memory is the highest of all files
+        df = pd.DataFrame(self.stages)
+        if "piek_mb" not in df:
+            df["piek_mb"] = float("nan")
+        summary = df.groupby("stage", sort=False).agg(
+            bestanden=("bestand", "nunique"),
+            wall_s=("wall_s", "sum"),
+            cpu_s=("cpu_s", "sum"),
+            piek_mb=("piek_mb", "max"),
+            rijen=("rijen", "sum"),
+        )
+        summary.loc["Totaal"] = [df["bestand"].nunique(), df["wall_s"].sum(), df["cpu_s"].sum(),
+                                 df["piek_mb"].max(), df["rijen"].sum()]
+
+        print(summary.round(3).to_string())
+        if self.geheugen:
+            print(f"piek_mb: {GEHEUGEN_NOOT}; timings include tracemalloc overhead")
+
+
+def get_piek_rss():
+    # Peak RSS of this process in bytes; None where resource is not available (Windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return rss if sys.platform == "darwin" else rss * 1024
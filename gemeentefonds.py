@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+# Gemeentefonds model: gewichten and volumina per circulaire, cluster totals and scenarios.
+# Shared by bereken_gf.py (ETL) and the app
+
+def safe_to_numeric(x):
+    # Convert values to numeric, with error handling
+    try:
+        return pd.to_numeric(x)
+    except ValueError:
+        return x
+
+
+def create_gf_model(circulaire, df_gewichten, df_volumina, df_siudu, uf):
+    
+    # Define indices, set to numeric
+    df_gewichten = df_gewichten.set_index("Codering maatstaf")
+    df_volumina = df_volumina.set_index("Naam")
+    df_siudu = df_siudu.set_index("Naam")
+    
+    df_gewichten = df_gewichten.apply(safe_to_numeric)
+    df_volumina = df_volumina.apply(safe_to_numeric)
+    df_siudu = df_siudu.apply(safe_to_numeric)
+    
+    # Take clusters from gewichten
+    clusters = list(df_gewichten.columns[1:])
+    
+    # Gewichten per maatstaf; where index == nan SIUDU (ART 12 added manually to cluster Overig)
+    au = df_gewichten[df_gewichten.index.notna()]
+    au_gewichten = {code: row for code, row in zip(au.index, au[clusters].values)}
+    au_namen = {code: naam for code, naam in zip(au.index, au['Naam maatstaf'])}
+    siudu = df_gewichten[df_gewichten.index.isna()]
+    siudu_gewichten = {naam: row for naam, row in zip(siudu['Naam maatstaf'], siudu[clusters].values)}
+    
+    volumina_columns = df_volumina.columns[2:]
+    siudu_columns = df_siudu.columns[2:]
+    
+    # Only maatstaven in both gewichten and volumina, and only if both lists have the same length
+    maatstaven, namen, gewichten, volumina = [], [], [], []
+    if len(au_gewichten) == len(set(volumina_columns)):
+        for code, row in au_gewichten.items():
+            if code in volumina_columns:
+                ufactor = 1 if "woz" in code.lower() else uf
+                maatstaven.append(code)
+                namen.append(au_namen[code])
+                gewichten.append(ufactor * row)
+                volumina.append(df_volumina[code])
+    
+    siudu_waarden = df_siudu.reindex(df_volumina.index)
+    if len(siudu_gewichten) == len(set(siudu_columns)):
+        for naam, row in siudu_gewichten.items():
+            if naam in siudu_columns:
+                maatstaven.append(naam)
+                namen.append(naam)
+                gewichten.append(row)
+                volumina.append(pd.to_numeric(siudu_waarden[naam], errors='coerce').fillna(0))
+    
+    model = {
+        "circulaire": circulaire,
+        "gemeenten": df_volumina.index.rename("Gemeenten"),
+        "clusters": clusters,
+        "maatstaven": pd.Index(maatstaven),
+        "namen": namen,
+        "gewichten": np.array(gewichten, dtype=float).reshape(len(maatstaven), len(clusters)),
+        "volumina": np.array(volumina, dtype=float).reshape(len(maatstaven), len(df_volumina)).T,
+    }
+    
+    return model
+
+
+def calculate_totals(model, volumina=None):
+    # Cluster totals: volumina (gemeenten x maatstaven) @ gewichten (maatstaven x clusters)
+    if volumina is None:
+        volumina = model["volumina"]
+    
+    return volumina @ model["gewichten"]
+
+
+def calculate_scenarios(model, gemeenten, mutaties):
+    # Batch of scenarios: one gemeente per scenario, mutaties as {maatstaf: relative change per scenario}
+    gemeenten = np.atleast_1d(gemeenten)
+    rows = model["gemeenten"].get_indexer(gemeenten)
+    if (rows == -1).any():
+        raise KeyError(f"Onbekende gemeenten: {', '.join(gemeenten[rows == -1])}")
+    
+    columns = model["maatstaven"].get_indexer(list(mutaties))
+    if (columns == -1).any():
+        raise KeyError(f"Onbekende maatstaven: {', '.join(np.array(list(mutaties))[columns == -1])}")
+    
+    # Same volumina, times (1 + change) for the perturbed maatstaven
+    factoren = np.ones((len(rows), len(model["maatstaven"])))
+    for column, mutatie in zip(columns, mutaties.values()):
+        factoren[:, column] += np.broadcast_to(np.asarray(mutatie, dtype=float), len(rows))
+    
+    volumina = model["volumina"][rows] * factoren
+    scenarios = pd.DataFrame(calculate_totals(model, volumina), columns=model["clusters"])
+    scenarios.insert(0, "Gemeenten", gemeenten)
+    
+    return scenarios
+
+
+def get_uitkeringsfactor(uf_data, circulaire):
+    # Uitkeringsfactor of a circulaire, e.g. GF_S2024_2025 or S2024_2025
+    c, jaar = circulaire.removeprefix("GF_").split("_")
+    uf = uf_data[(uf_data['Circulaire'] == c) & (uf_data['Jaar'] == int(jaar))]['Uitkeringsfactor']
+    if uf.empty:
+        raise KeyError(f"Geen uitkeringsfactor voor {circulaire}")
+    
+    return float(uf.iloc[0])
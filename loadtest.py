@@ -0,0 +1,221 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# Local data only: set before the app is loaded
+REPO_MAP = os.path.dirname(os.path.abspath(__file__)) + "/"
+os.environ.setdefault("BEGROTINGSANALYSE_DATA", REPO_MAP)
+
+from streamlit import config
+from streamlit.testing.v1 import AppTest
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+from etl_profiel import get_piek_rss
+
+# Globals
+APP = REPO_MAP + "streamlit_app.py"
+SESSIES = "1,2,4,8"
+STAPPEN = 20
+TIMEOUT = 120
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for streamlit_app.py with simulated sessions")
+    parser.add_argument("--sessies", default=SESSIES, help="Comma-separated session counts, e.g. 1,2,4,8")
+    parser.add_argument("--stappen", type=int, default=STAPPEN, help="Widget interactions per session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--niveau", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.niveau:
+        print(json.dumps(run_niveau(args.niveau, args.stappen, args.seed)))
+        return
+
+    # Each session count in a fresh process: peak RSS and warm caches per level,
+    # independent of the order of --sessies
+    resultaten = []
+    for aantal in [int(i) for i in args.sessies.split(",")]:
+        proces = subprocess.run([sys.executable, os.path.abspath(__file__), "--niveau", str(aantal),
+                                 "--stappen", str(args.stappen), "--seed", str(args.seed)],
+                                capture_output=True, text=True)
+        if proces.returncode != 0:
+            sys.exit(f"{aantal} sessies mislukt:\n{proces.stderr}")
+        
+        resultaat = json.loads(proces.stdout.strip().splitlines()[-1])
+        if not resultaten:
+            print(" | ".join(f"{key:>12}" for key in resultaat))
+        print(" | ".join(f"{value:>12}" for value in resultaat.values()))
+        resultaten.append(resultaat)
+
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as file:
+            json.dump(resultaten, file, indent=2)
+
+
+def run_niveau(aantal, stappen, seed):
+    # Relative paths in the app (bundle) resolve against the repo
+    os.chdir(REPO_MAP)
+    deel_script_cache()
+    deel_runtime()
+    # AppTest switches this global option on per run and back off afterwards,
+    # which drops widget test data of sessions still running in other threads
+    config.set_option("global.appTest", True)
+
+    warm_op()
+    return run_sessies(aantal, stappen, seed)
+
+
+def warm_op():
+    # Untimed: load the datasets of every year and circulaire once, so the measured
+    # reruns do not include the cold-cache loads
+    at = AppTest.from_file(APP, default_timeout=TIMEOUT)
+    at.run()
+    for jaar in get_selectbox(at, "0").options:
+        get_selectbox(at, "0").set_value(jaar)
+        at.run()
+        circulaires = get_selectbox(at, "3")
+        for circulaire in (circulaires.options if circulaires else []):
+            get_selectbox(at, "3").set_value(circulaire)
+            at.run()
+
+
+def deel_script_cache():
+    # AppTest compiles the script on every run, the server only once per worker. Without
+    # one shared cache, sessions compiling concurrently failed here with "SystemError: AST
+    # constructor recursion depth mismatch" (CPython 3.11.7).
+    # Patches the private ScriptCache.get_bytecode for the whole process: written against
+    # Streamlit 1.66, check this when upgrading Streamlit
+    if not hasattr(ScriptCache, "get_bytecode"):
+        raise RuntimeError("ScriptCache.get_bytecode not found: check loadtest.py against this Streamlit version")
+    
+    gedeelde_cache = ScriptCache()
+    get_bytecode = ScriptCache.get_bytecode
+    ScriptCache.get_bytecode = lambda self, script_path: get_bytecode(gedeelde_cache, script_path)
+
+
+def deel_runtime():
+    # AppTest sets a mock Runtime per run and clears it afterwards, which fails the cleanup
+    # of sessions still running in other threads ("Runtime hasn't been created!").
+    # Fall back to the last mock Runtime; also a private API, check when upgrading Streamlit
+    laatste = []
+    instance = Runtime.instance.__func__
+    
+    def gedeelde_instance(cls):
+        if cls._instance is not None:
+            laatste[:] = [cls._instance]
+        elif laatste:
+            return laatste[0]
+        return instance(cls)
+    
+    Runtime.instance = classmethod(gedeelde_instance)
+
+
+def run_sessies(aantal, stappen, seed):
+    start = time.perf_counter()
+
+    # One thread per session, all sharing the process caches like a single worker
+    with ThreadPoolExecutor(max_workers=aantal) as executor:
+        sessies = list(executor.map(lambda i: run_sessie(stappen, random.Random(seed + i)), range(aantal)))
+
+    duur = time.perf_counter() - start
+    latencies = sorted(latency for sessie in sessies for latency in sessie["latencies"])
+    fouten = sum(sessie["fouten"] for sessie in sessies)
+    piek_rss = get_piek_rss()
+
+    return {
+        "sessies": aantal,
+        "reruns": len(latencies) + fouten,
+        "fouten": fouten,
+        "p50_ms": round(1000 * percentile(latencies, 50), 1),
+        "p95_ms": round(1000 * percentile(latencies, 95), 1),
+        "reruns_per_s": round(len(latencies) / duur, 2),
+        # Process peak, including the warm-up; None where not available (Windows)
+        "piek_rss_mb": round(piek_rss / 2**20, 1) if piek_rss is not None else None,
+    }
+
+
+def run_sessie(stappen, rng):
+    at = AppTest.from_file(APP, default_timeout=TIMEOUT)
+    sessie = {"latencies": [], "fouten": 0}
+
+    rerun(at, sessie)
+    for _ in range(stappen):
+        actie = rng.choice(ACTIES)
+        if actie(at, rng):
+            rerun(at, sessie)
+
+    return sessie
+
+
+def rerun(at, sessie):
+    start = time.perf_counter()
+    at.run()
+    latency = time.perf_counter() - start
+
+    # Failed reruns stop early: count them, but keep them out of the percentiles
+    if at.exception:
+        sessie["fouten"] += 1
+    else:
+        sessie["latencies"].append(latency)
+
+
+def get_selectbox(at, key):
+    widgets = [widget for widget in at.selectbox if str(widget.key) == key]
+    return widgets[0] if widgets else None
+
+
+def kies_optie(at, rng, key, leeg=False):
+    widget = get_selectbox(at, key)
+    if widget is None or not widget.options:
+        return False
+
+    opties = list(widget.options) + ([None] if leeg else [])
+    widget.set_value(rng.choice(opties))
+    return True
+
+
+def kies_jaar(at, rng):
+    return kies_optie(at, rng, "0")
+
+
+def kies_gemeente(at, rng):
+    return kies_optie(at, rng, "1")
+
+
+def kies_circulaire(at, rng):
+    return kies_optie(at, rng, "3")
+
+
+def kies_vergelijking(at, rng):
+    return kies_optie(at, rng, "20", leeg=True)
+
+
+def kies_overhead(at, rng):
+    widgets = [widget for widget in at.toggle if widget.label == "Overhead toegedeeld?"]
+    if not widgets:
+        return False
+
+    widgets[0].set_value(not widgets[0].value)
+    return True
+
+
+ACTIES = [kies_jaar, kies_gemeente, kies_gemeente, kies_circulaire, kies_overhead, kies_vergelijking]
+
+
+def percentile(waarden, p):
+    if not waarden:
+        return 0.0
+    if len(waarden) == 1:
+        return waarden[0]
+    return statistics.quantiles(waarden, n=100, method="inclusive")[p - 1]
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
+import os
 import csv
+import urllib.request
 
 import altair as alt
 import pandas as pd
@@ -6,11 +8,22 @@ import streamlit as st
 import matplotlib
 import vl_convert as vlc
 
+from gemeentefonds import create_gf_model, get_uitkeringsfactor, calculate_scenarios
+from clusterindeling import aggregate_clusters
+from databundel import DataBundel
+
 # Globals
 JAAR_MINIMUM = 2023
 JAAR_MAXIMUM = 2025
 LAATSTE_JR = 2023
 LAATSTE_CRE = "S2024"
+BUNDEL_MAP = "Analysedata/Bundel/"
+BUNDEL_INTERVAL = 30 # Seconds between checks for a new bundle or CSV version
+CSV_MAX_ENTRIES = 100 # Datasets read as CSV; entries for replaced versions are evicted over time
+QUERY_MAX_ENTRIES = 1000 # Per query; entries for replaced datasets are evicted over time
+# Local checkout for offline runs, e.g. BEGROTINGSANALYSE_DATA=./
+DATA_URL = os.environ.get("BEGROTINGSANALYSE_DATA", 
+                          "https://raw.githubusercontent.com/michielsd/begrotingsanalysetool/refs/heads/main/")
 
 ############################################################################
 
@@ -24,13 +37,76 @@ def safe_to_numeric(x):
 
 # Data import
 @st.cache_resource
+def get_databundel():
+    # Bundle built by bereken_bundel.py, checked for new versions in the background
+    return DataBundel(BUNDEL_MAP, interval=BUNDEL_INTERVAL)
+
+@st.cache_data(ttl=BUNDEL_INTERVAL)
+def get_csvversie(filepath):
+    # Content version of a CSV without reading it: the ETag of a URL (raw.githubusercontent
+    # sets one per file content) or else Last-Modified and size, mtime and size of a local file
+    try:
+        if filepath.startswith(("http://", "https://")):
+            request = urllib.request.Request(filepath, method="HEAD")
+            with urllib.request.urlopen(request, timeout=10) as response:
+                headers = response.headers
+                return headers.get("ETag") or f"{headers.get('Last-Modified')}-{headers.get('Content-Length')}"
+        
+        stat = os.stat(filepath)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+    except OSError:
+        # Missing file: reading it raises the error
+        return None
+
+@st.cache_resource(max_entries=CSV_MAX_ENTRIES)
+def get_csvdata(filepath, versie, sep, verwerk_naam=None, _verwerk=None, decimal=".", thousands=None):
+    data = pd.read_csv(filepath, sep=sep, decimal=decimal, thousands=thousands)
+    
+    return _verwerk(data) if _verwerk else data
+
+def read_dataset(naam, sep, verwerk=None, decimal=".", thousands=None):
+    data = get_databundel().get(naam, verwerk)
+    
+    # Without a bundle, the CSVs are read instead, cached per content version
+    if data is None:
+        filepath = f"{DATA_URL}{naam}.csv"
+        verwerk_naam = verwerk.__qualname__ if verwerk else None
+        data = get_csvdata(filepath, get_csvversie(filepath), sep, verwerk_naam, verwerk, decimal, thousands)
+    
+    return data
+
+def get_datahash(*namen):
+    # Content hash of each dataset a query reads: from the bundle, else the CSV version
+    bundel = get_databundel()
+    
+    return tuple(bundel.get_hash(naam) or get_csvversie(f"{DATA_URL}{naam}.csv") for naam in namen)
+
+# Dataset names: the file path without .csv, as in the bundle manifest
+def iv3_naam(jaar, doc):
+    return f"Analysedata/Iv3/{jaar}_{doc.lower()}"
+
+def klassen_naam(jaar):
+    return f"Brondata/Gemeenteklassen/{jaar}"
+
+def gf_naam(gf_path):
+    return f"Analysedata/GF/GF_{gf_path}"
+
+def vergelijkbaar_naam(jaar, doc):
+    return f"Analysedata/Vergelijkbaar/{jaar}_{doc.lower()}"
+
+def realisatie_naam(jaar):
+    return f"Analysedata/Realisatie/{jaar}_clusters"
+
+def gf_brondata_naam(circulaire, deel):
+    return f"Brondata/GF/Clusterdata/GF_{circulaire}_{deel}"
+
+UF_NAAM = "Brondata/GF/Uitkeringsfactor"
+
 def get_iv3data(jaar, doc):
-    filepath = f"https://raw.githubusercontent.com/michielsd/begrotingsanalysetool/refs/heads/main/Analysedata/Iv3/{jaar}_{doc.lower()}.csv"
-    data = pd.read_csv(filepath, sep=";")
+    data = read_dataset(iv3_naam(jaar, doc), sep=";")
 
     return data
 
-@st.cache_data
 def filter_iv3data(data, gemeente):
     
     # Filter out gemeente
@@ -69,11 +145,8 @@ def get_gemeente_chars(data, gemeente):
     return return_df    
     
 
-@st.cache_resource
 def get_class_data(jaar, gemeente):
-    filepath = f"https://raw.githubusercontent.com/michielsd/begrotingsanalysetool/refs/heads/main/Brondata/Gemeenteklassen/{jaar}.csv"
-    
-    data = pd.read_csv(filepath, sep="\t")
+    data = read_dataset(klassen_naam(jaar), sep="\t")
     data = data.set_index("Gemeenten")
     
     if gemeente in ["'s-Gravenhage", "Groningen", "Utrecht"]:
@@ -86,14 +159,25 @@ def get_class_data(jaar, gemeente):
         return data
 
 
-@st.cache_resource
 def get_gfdata(gf_path):
-    filepath = f"https://raw.githubusercontent.com/michielsd/begrotingsanalysetool/refs/heads/main/Analysedata/GF/GF_{gf_path}.csv"
-    data = pd.read_csv(filepath, sep=";")
+    data = read_dataset(gf_naam(gf_path), sep=";")
     
     return data
 
-@st.cache_data
+def get_vergelijkbaar(jaar, doc):
+    vergelijkbaar_dict = read_dataset(vergelijkbaar_naam(jaar, doc), sep=";", 
+                                      verwerk=to_vergelijkbaar_dict)
+    
+    return vergelijkbaar_dict
+
+def to_vergelijkbaar_dict(data):
+    
+    # Precomputed top-k per gemeente, so a lookup is a dict access
+    vergelijkbaar_dict = {gemeente: tuple(groep.sort_values("Rang")["Vergelijkbaar"]) 
+                          for gemeente, groep in data.groupby("Gemeenten")}
+    
+    return vergelijkbaar_dict
+
 def filter_gfdata(data, gemeente):
     
     # Filter out gemeente
@@ -112,6 +196,122 @@ def filter_gfdata(data, gemeente):
     
     return filtered_data
 
+def get_realisatie(jaar):
+    data = read_dataset(realisatie_naam(jaar), sep=";")
+    
+    return data
+
+def filter_realisatie(data, gemeente):
+    
+    # Filter out gemeente, keep begroting vs jaarrekening per cluster
+    filtered_data = data[data['Gemeenten'] == gemeente]
+    filtered_data = filtered_data.set_index("Cluster")
+    filtered_data = filtered_data[['Saldo begroting', 'Saldo jaarrekening', 'Saldo verschil', 
+                                   'Saldo verschil per inwoner', 'Afwijking']]
+    filtered_data = filtered_data.rename(columns={"Saldo begroting": "Begroting", 
+                                                  "Saldo jaarrekening": "Jaarrekening",
+                                                  "Saldo verschil": "Verschil",
+                                                  "Saldo verschil per inwoner": "Verschil per inwoner"})
+    
+    return filtered_data
+
+def get_uitschieters(data, cluster, aantal=10):
+    
+    # Largest national deviations of (jaarrekening - begroting) per inwoner within one cluster
+    filtered_data = data[(data['Cluster'] == cluster) & data['Afwijking'].notna()]
+    filtered_data = filtered_data.loc[filtered_data['Afwijking'].abs().sort_values(ascending=False).index[:aantal]]
+    filtered_data = filtered_data.set_index("Gemeenten")
+    filtered_data = filtered_data[['Saldo verschil', 'Saldo verschil per inwoner', 'Afwijking']]
+    filtered_data = filtered_data.rename(columns={"Saldo verschil": "Verschil", 
+                                                  "Saldo verschil per inwoner": "Verschil per inwoner"})
+    
+    return filtered_data
+
+def get_gf_brondata(circulaire, deel):
+    # Gewichten, Volumina or SIUDU of a circulaire, e.g. S2024_2025
+    data = read_dataset(gf_brondata_naam(circulaire, deel), sep="\t", decimal=",", thousands=".")
+    
+    return data
+
+def get_ufdata():
+    data = read_dataset(UF_NAAM, sep=",")
+    
+    return data
+
+@st.cache_resource(max_entries=8)
+def get_gf_scenariomodel(circulaire, datahash):
+    uf = get_uitkeringsfactor(get_ufdata(), circulaire)
+    
+    # Gewichten and volumina held in memory, scenarios are a matrix product
+    model = create_gf_model(f"GF_{circulaire}", get_gf_brondata(circulaire, "Gewichten"), 
+                            get_gf_brondata(circulaire, "Volumina"), get_gf_brondata(circulaire, "SIUDU"), uf)
+    
+    return model
+
+def create_scenario_table(model, gemeente, mutaties):
+    
+    # Current and scenario in one call: no change for the first row
+    scenarios = calculate_scenarios(model, [gemeente, gemeente], 
+                                    {maatstaf: [0, mutatie] for maatstaf, mutatie in mutaties.items()})
+    
+    md = scenarios.drop(columns="Gemeenten").T
+    md.columns = ["Huidig", "Scenario"]
+    md = md.rename_axis("Cluster")
+    md['Verschil'] = md['Scenario'] - md['Huidig']
+    
+    # In € 1.000
+    md = md.map(lambda x: int(x / 1000))
+    
+    return md
+
+# Query layer: the page's entry point. Cached on small identifiers plus the content hash
+# of the datasets read (get_datahash), so no DataFrame is hashed per rerun and publishing
+# one dataset only invalidates the queries on that dataset
+@st.cache_data(max_entries=QUERY_MAX_ENTRIES)
+def query_gemeenten(jaar, doc, datahash):
+    return list(get_iv3data(jaar, doc)['Gemeenten'].unique())
+
+@st.cache_data(max_entries=QUERY_MAX_ENTRIES)
+def query_vergelijkingsopties(jaar, doc, gemeente, socstr, centr, vergelijkbaar, datahash):
+    data = get_iv3data(jaar, doc)
+    gemeente_info = get_gemeente_chars(data, gemeente)
+    
+    if socstr:
+        data = data[data['Sociale structuur'] == gemeente_info['Sociale structuur'].values[0]]
+    if centr:
+        data = data[data['Centrumfunctie'] == gemeente_info['Centrumfunctie'].values[0]]
+    opties = list(data['Gemeenten'].unique())
+    
+    if vergelijkbaar:
+        opties = [g for g in get_vergelijkbaar(jaar, doc).get(gemeente, ()) if g in opties]
+    
+    return opties
+
+@st.cache_data(max_entries=QUERY_MAX_ENTRIES)
+def query_iv3(jaar, doc, gemeente, datahash):
+    return filter_iv3data(get_iv3data(jaar, doc), gemeente)
+
+@st.cache_data(max_entries=QUERY_MAX_ENTRIES)
+def query_iv3_clusters(jaar, doc, gemeente, overhead, datahash):
+    return iv3_to_cluster(query_iv3(jaar, doc, gemeente, datahash), jaar, overhead)
+
+@st.cache_data(max_entries=QUERY_MAX_ENTRIES)
+def query_gf(circulaire, gemeente, datahash):
+    return filter_gfdata(get_gfdata(circulaire), gemeente)
+
+@st.cache_data(max_entries=QUERY_MAX_ENTRIES)
+def query_inwoners(jaar, gemeente, datahash):
+    return get_class_data(jaar, gemeente)['Inwonertal'].sum()
+
+@st.cache_data(max_entries=QUERY_MAX_ENTRIES)
+def query_realisatie(jaar, gemeente, datahash):
+    return filter_realisatie(get_realisatie(jaar), gemeente)
+
+@st.cache_data(max_entries=QUERY_MAX_ENTRIES)
+def query_uitschieters(jaar, cluster, datahash):
+    return get_uitschieters(get_realisatie(jaar), cluster)
+
+
 def get_circulaires(jaar):
     circulaire_dict = {}
     
@@ -143,45 +343,16 @@ def get_circulaires(jaar):
     return circulaire_list, circulaire_dict
 
 
-def get_cluster_dict():
-    
-    # GF names to tuples w/ Iv3-taakvelden
-    cluster_to_iv3 = {
-        "Sociale basisvoorzieningen" : ("6.1", "6.2", "7.1"),
-        "Participatie": ("6.3", "6.4", "6.5"),
-        "Individuele voorzieningen Wmo": ("6.6", "6.71", "6.81"),
-        "Individuele voorzieningen Jeugd": ("6.72", "6.73", "6.74", "6.75", "6.76", "6.792", "6.82", "6.92"),
-        "Bestuur en ondersteuning": ("0.1 ", "0.2"), # Spatie achter 0.1
-        "Orde en veiligheid": ("1."),
-        "Onderwijs": ("4."),
-        "Sport, cultuur en recreatie": ("5."),
-        "Infrastructuur, ruimte en milieu": ("0.63", "0.9", "2.", "3.", "7.2", "7.3", "7.4", "7.5", "8.1", "8.3"),
-        "Overig": ("Dummy"), # Dummy variable
-        "Overige eigen middelen": ("0.11", "0.3", "0.5", "0.64", "0.8", "8.2"),
-        "Onroerendezaakbelasting": ("0.61", "0.62"),
-        "Overhead" : ("0.4"),
-        "Gemeentefonds" : ("0.7"),
-        "Mutatie reserves": ("0.10"), # Waarom hier niet 0.11 bij?
-    }
-    
-    return cluster_to_iv3
-    
-
-def iv3_to_cluster(df, overhead, custom_df=None):
-    
-    cluster_dict = get_cluster_dict()
+def iv3_to_cluster(df, jaar, overhead, custom_df=None):
     
     if custom_df is not None:
         cdf = custom_df.copy()
     else:
         cdf = df.copy()
     
-    for cluster, iv3_codes in cluster_dict.items():
-        df.loc[cluster] = df.loc[df.index.str.startswith(iv3_codes)].sum()
-        cdf.loc[cluster] = cdf.loc[cdf.index.str.startswith(iv3_codes)].sum()
-    
-    df = df.loc[df.index.isin(cluster_dict.keys())]
-    cdf = cdf.loc[cdf.index.isin(cluster_dict.keys())]
+    # Compiled taakveld -> cluster lookup for the Iv3 indeling of this year
+    df = aggregate_clusters(df.reset_index(), jaar, df.columns).rename_axis("Taakveld")
+    cdf = aggregate_clusters(cdf.reset_index(), jaar, cdf.columns).rename_axis("Taakveld")
     
     if overhead:
         overhead_row = df.loc["Overhead"]
@@ -190,11 +361,11 @@ def iv3_to_cluster(df, overhead, custom_df=None):
         for index, row in df.iterrows():
             fraction = row["L1.1 Salarissen en sociale lasten"] / total_l1_1
             if index != "Overhead":
-                cdf.at[index, "Lasten"] += int(overhead_row["Lasten"] * fraction)
+                cdf.at[index, "Lasten"] += round(overhead_row["Lasten"] * fraction)
             else:
                 cdf.at[index, "Baten"] = 0
                 cdf.at[index, "Lasten"] = 0
-                cdf.at["Bestuur en ondersteuning", "Lasten"] += int(overhead_row["Saldo"] * fraction)
+                cdf.at["Bestuur en ondersteuning", "Lasten"] += round(overhead_row["Saldo"] * fraction)
         
         cdf = cdf.assign(Saldo=cdf['Lasten'] - cdf['Baten'])
     
@@ -249,7 +420,7 @@ def combine_into_chart(iv3_data, gf_data, gemeente):
     
     return md, chart_help, custom_order
 
-def create_table(iv3_data, gf_data, jaar, gemeente):
+def create_table(iv3_data, gf_data, inwoners):
     i = iv3_data.copy()
     g = gf_data.copy()
     
@@ -271,7 +442,6 @@ def create_table(iv3_data, gf_data, jaar, gemeente):
     md.loc["Gemeentefonds", "Gemeentefonds"] *= -1
     md['Verschil'] = md['Netto lasten'] - md['Gemeentefonds']
         
-    inwoners = get_class_data(jaar, gemeente)['Inwonertal'].sum()
     md['Verschil per inwoner'] = round(1000 * md['Verschil'] / inwoners, 2)
     
     md.fillna(0, inplace=True)
@@ -281,7 +451,7 @@ def create_table(iv3_data, gf_data, jaar, gemeente):
     inkomsten.loc["Totaal inkomstenclusters"] = inkomsten.sum()
     for col in inkomsten.columns:
         if col != "Verschil per inwoner":
-            inkomsten[col] = inkomsten[col].map(lambda x: int(x))
+            inkomsten[col] = inkomsten[col].map(lambda x: round(x))
     
     uitgaven = md.loc[['Bestuur en ondersteuning', 'Sociale basisvoorzieningen', 'Participatie', \
         'Individuele voorzieningen Wmo', 'Individuele voorzieningen Jeugd', 'Orde en veiligheid', \
@@ -290,7 +460,7 @@ def create_table(iv3_data, gf_data, jaar, gemeente):
     uitgaven.loc["Totaal uitgavenclusters"] = uitgaven.sum()
     for col in uitgaven.columns:
         if col != "Verschil per inwoner":
-            uitgaven[col] = uitgaven[col].map(lambda x: int(x))
+            uitgaven[col] = uitgaven[col].map(lambda x: round(x))
     
     
     returndict = {"**Inkomstenclusters**": inkomsten, "**Uitgavenclusters**": uitgaven}
@@ -310,6 +480,8 @@ st.set_page_config(layout="wide")
 # Body
 header_container = st.container()
 chart_container = st.container()
+realisatie_container = st.container()
+scenario_container = st.container()
 iv3_table_container = st.container()
 
 # Sidebar
@@ -322,7 +494,8 @@ with st.sidebar:
                                  index=len(sidebar_jaren)-1,
                                  key=0)
     
-    sidebar_gemeenten = get_iv3data(selected_jaar, "begroting").Gemeenten.unique()
+    sidebar_gemeenten = query_gemeenten(selected_jaar, "Begroting", 
+                                        get_datahash(iv3_naam(selected_jaar, "Begroting")))
     selected_gemeente = st.selectbox("Selecteer de gemeente",
                                  sidebar_gemeenten,
                                  key=1)
@@ -341,6 +514,8 @@ with st.sidebar:
     st.session_state["jaar"] = selected_jaar
     st.session_state["gemeente"] = selected_gemeente
     
+    iv3_hash = get_datahash(iv3_naam(selected_jaar, selected_doc))
+    
 with header_container:
     h1, h2, h3 = st.columns([2, 4, 2])
 
@@ -354,6 +529,29 @@ with header_container:
         )
 
 
+# Before the chart: does not depend on the GF data, which is incomplete for some years
+if int(selected_jaar) <= LAATSTE_JR:
+    with realisatie_container:
+        h1, h2, h3 = st.columns([1, 4, 1])
+        
+        with h2:
+            st.header("Begroting en realisatie", divider="gray")
+            
+            st.markdown("In € 1.000; Verschil is jaarrekening min begroting, netto lasten; " \
+                "Verschil per inwoner is in € 1; Afwijking is t.o.v. alle gemeenten (z-score)")
+            realisatie_hash = get_datahash(realisatie_naam(selected_jaar))
+            realisatie_table = query_realisatie(selected_jaar, selected_gemeente, realisatie_hash)
+            st.dataframe(realisatie_table.style.format(thousands='.', decimal=',', precision=2), 
+                         width=700, height=(len(realisatie_table)+1)*36)
+            
+            selected_cluster = st.selectbox("Landelijke uitschieters voor cluster",
+                                            realisatie_table.index,
+                                            key=4)
+            uitschieters = query_uitschieters(selected_jaar, selected_cluster, realisatie_hash)
+            st.dataframe(uitschieters.style.format(thousands='.', decimal=',', precision=2), 
+                         width=700, height=(len(uitschieters)+1)*36)
+
+
 with chart_container:
     h1, h2, h3 = st.columns([1, 4, 1])
     
@@ -364,8 +562,6 @@ with chart_container:
                                  index=len(circulaires) -1,
                                  key=3)
         
-        gemeente_info = get_gemeente_chars(get_iv3data(selected_jaar, selected_doc), selected_gemeente) 
-        
         b1, b2, b3 = st.columns([1,1,1])
         with b1:
             overhead_select = st.toggle("Overhead toegedeeld?")
@@ -374,13 +570,12 @@ with chart_container:
                                                                      
             socstr_select = v_box.toggle("Alleen gemeenten met dezelfde sociale structuur")
             centr_select = v_box.toggle("Alleen gemeenten met dezelfde centrumfunctie")
+            vergelijkbaar_select = v_box.toggle("Alleen meest vergelijkbare gemeenten (lasten per inwoner)")
             
-            vgl_df = get_iv3data(selected_jaar, selected_doc)     
-            if socstr_select:
-                vgl_df = vgl_df[vgl_df['Sociale structuur'] == gemeente_info['Sociale structuur'].values[0]]
-            if centr_select:
-                vgl_df = vgl_df[vgl_df['Centrumfunctie'] == gemeente_info['Centrumfunctie'].values[0]]
-            vgl_opties = vgl_df.Gemeenten.unique()                        
+            vgl_opties = query_vergelijkingsopties(selected_jaar, selected_doc, selected_gemeente, 
+                                                   socstr_select, centr_select, vergelijkbaar_select, 
+                                                   get_datahash(iv3_naam(selected_jaar, selected_doc), 
+                                                                vergelijkbaar_naam(selected_jaar, selected_doc)))
                 
             vergelijken_1 = v_box.selectbox("Selecteer een gemeente",
                                  vgl_opties,
@@ -396,17 +591,21 @@ with chart_container:
                                  key=22)
             vgl_gemeenten = tuple(i for i in [vergelijken_1, vergelijken_2, vergelijken_3] if i)
 
-        gf_cluster_data = filter_gfdata(get_gfdata(circulaire_dict[selected_circulaire]), selected_gemeente)
-        gemeente_iv3data = filter_iv3data(get_iv3data(selected_jaar, selected_doc), selected_gemeente) 
+        gf_hash = get_datahash(gf_naam(circulaire_dict[selected_circulaire]))
+        
+        # Missing (OSError) or incomplete (KeyError) GF data for some circulaires
+        try:
+            gf_cluster_data = query_gf(circulaire_dict[selected_circulaire], selected_gemeente, gf_hash)
+        except (OSError, KeyError):
+            st.warning(f"Geen gemeentefondsdata voor de circulaire {selected_circulaire}.")
+            st.stop()
         
         if "tabel" in st.session_state:
-            iv3_cluster_data = iv3_to_cluster(filter_iv3data(get_iv3data(
-                selected_jaar, selected_doc), 
-                selected_gemeente), overhead_select, st.session_state["tabel"])
+            iv3_cluster_data = iv3_to_cluster(query_iv3(selected_jaar, selected_doc, selected_gemeente, iv3_hash), 
+                                              selected_jaar, overhead_select, st.session_state["tabel"])
         else:
-            iv3_cluster_data = iv3_to_cluster(filter_iv3data(get_iv3data(
-                selected_jaar, selected_doc), 
-                selected_gemeente), overhead_select)
+            iv3_cluster_data = query_iv3_clusters(selected_jaar, selected_doc, selected_gemeente, 
+                                                  overhead_select, iv3_hash)
         
         # Chart
         chart_data, chart_help, cluster_order = combine_into_chart(iv3_cluster_data, gf_cluster_data, selected_gemeente)
@@ -428,11 +627,9 @@ with chart_container:
         st.altair_chart(chart, use_container_width=True)
         
         if len(vgl_gemeenten) > 0:
-            vgl_cluster_data = filter_gfdata(get_gfdata(circulaire_dict[selected_circulaire]), vgl_gemeenten)
-            vgl_iv3data = iv3_to_cluster(filter_iv3data(get_iv3data(
-                selected_jaar, selected_doc), 
-                selected_gemeente), overhead_select
-            ) 
+            vgl_cluster_data = query_gf(circulaire_dict[selected_circulaire], vgl_gemeenten, gf_hash)
+            vgl_iv3data = query_iv3_clusters(selected_jaar, selected_doc, selected_gemeente, 
+                                             overhead_select, iv3_hash)
             
             if len(vgl_gemeenten) == 1:
                 vgl_text = vgl_gemeenten[0]
@@ -458,7 +655,8 @@ with chart_container:
         st.markdown(chart_help)
         
         # Table
-        tables = create_table(iv3_cluster_data, gf_cluster_data, selected_jaar, selected_gemeente)
+        inwoners = query_inwoners(selected_jaar, selected_gemeente, get_datahash(klassen_naam(selected_jaar)))
+        tables = create_table(iv3_cluster_data, gf_cluster_data, inwoners)
         
         for table_header, table in tables.items():
             st.markdown(table_header)
@@ -471,8 +669,36 @@ with chart_container:
             )
             
             st.dataframe(formatted_table, width=700, height=(len(table)+1)*36)
+
+
+with scenario_container:
+    h1, h2, h3 = st.columns([1, 4, 1])
+    
+    with h2:
+        st.header("Scenario's gemeentefonds", divider="gray")
+        circulaire = circulaire_dict[selected_circulaire]
+        scenario_model = get_gf_scenariomodel(circulaire, get_datahash(UF_NAAM, 
+            *[gf_brondata_naam(circulaire, deel) for deel in ("Gewichten", "Volumina", "SIUDU")]))
+        gf_gemeenten = [g for g in scenario_model["gemeenten"] if g.startswith(selected_gemeente)]
         
-        
+        if not gf_gemeenten:
+            st.markdown(f"Geen volumina voor {selected_gemeente} in deze circulaire.")
+        else:
+            maatstaf_namen = dict(zip(scenario_model["maatstaven"], scenario_model["namen"]))
+            selected_maatstaven = st.multiselect("Selecteer maatstaven om aan te passen",
+                                                 scenario_model["maatstaven"],
+                                                 format_func=lambda m: maatstaf_namen[m],
+                                                 key=5)
+            
+            mutaties = {m: st.slider(f"Verandering {maatstaf_namen[m]} (%)", -50, 50, 0, key=f"scenario_{m}") / 100 
+                        for m in selected_maatstaven}
+            
+            if mutaties:
+                scenario_table = create_scenario_table(scenario_model, gf_gemeenten[0], mutaties)
+                
+                st.markdown("In € 1.000; gewichten en uitkeringsfactor van de circulaire")
+                st.dataframe(scenario_table.style.format(thousands='.', decimal=','), 
+                             width=700, height=(len(scenario_table)+1)*36)
         
         
 